@@ -0,0 +1,13 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+# Start a worker with:  celery -A core worker
+# (settings.CELERY_WORKER_POOL selects the threads pool).
+app = Celery('core')
+
+# Read CELERY_* options from the Django settings.
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
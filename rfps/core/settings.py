@@ -129,3 +129,49 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.CustomUser'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# Celery (background document ingestion)
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_TASK_TRACK_STARTED = True
+# ingest_project parses files in its own process pool, which the default
+# prefork pool's daemonic children are not allowed to start.
+CELERY_WORKER_POOL = 'threads'
+
+# Processes used to load and split a project's documents during ingestion
+# (never more than it has documents). Set to 1 to parse files one at a
+# time in the task itself, e.g. on rotating disks. RFP_INGEST_WORKERS is
+# the old name and is still read for existing deployments.
+RFP_LOAD_WORKERS = int(os.environ.get(
+    'RFP_LOAD_WORKERS',
+    os.environ.get('RFP_INGEST_WORKERS', max((os.cpu_count() or 2) - 1, 1))))
+
+# Logging: request threads only enqueue records; a QueueListener thread
+# (started in MainConfig.ready) does the blocking console writes.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+        'queue': {
+            'class': 'logging.handlers.QueueHandler',
+            'handlers': ['console'],
+            'respect_handler_level': True,
+        },
+    },
+    'loggers': {
+        'main': {
+            'handlers': ['queue'],
+            'level': os.environ.get('RFP_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -1,6 +1,34 @@
+import atexit
+import logging
+import os
+import threading
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        # settings.LOGGING routes the app's loggers through a QueueHandler;
+        # its listener thread does the actual writes.
+        queue_handler = logging.getHandlerByName('queue')
+        if queue_handler is not None and queue_handler.listener is not None:
+            queue_handler.listener.start()
+            atexit.register(queue_handler.listener.stop)
+
+        # Warm the RAG singletons at startup so the first request doesn't pay
+        # for it. Only in serving processes: the runserver child (RUN_MAIN),
+        # or any worker started with RAG_WARMUP=1 (e.g. each Gunicorn worker,
+        # without --preload, since the thread does not survive a fork).
+        if os.environ.get('RUN_MAIN') != 'true' and os.environ.get('RAG_WARMUP') != '1':
+            return
+
+        from .utils.rag_service import RAGService
+
+        # In the background, so the worker starts accepting requests while
+        # it warms; a request arriving first waits on RAGService's lock.
+        threading.Thread(
+            target=RAGService.warmup, name='rag-warmup', daemon=True).start()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-14 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_rfpdocument_project'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rfpdocument',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-14 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_alter_rfpdocument_uploaded_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rfpdocument',
+            index=models.Index(fields=['project', '-uploaded_at'], name='main_rfpdoc_project_upl_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-14 13:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_rfpdocument_main_rfpdoc_project_upl_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,6 +1,5 @@
 from django.db import models
 from users.models import CustomUser
-from rest_framework.utils.timezone import datetime
 
 
 class Project(models.Model):
@@ -22,6 +21,7 @@ class Project(models.Model):
         CustomUser, on_delete=models.CASCADE, related_name="projects")
     primary_contacts = models.ManyToManyField(
         CustomUser, related_name="assigned")
+    updated_at = models.DateTimeField(auto_now=True)
 
     REQUIRED_FILEDS = ['name', 'type']
 
@@ -43,7 +43,7 @@ class RFPDocument(models.Model):
     uploaded_by = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name='uploader')
 
-    uploaded_at = models.DateTimeField(default=datetime.now)
+    uploaded_at = models.DateTimeField(auto_now_add=True, db_index=True)
     project = models.ForeignKey(
         'Project',
         on_delete=models.SET_NULL,
@@ -52,5 +52,11 @@ class RFPDocument(models.Model):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', '-uploaded_at'],
+                         name='main_rfpdoc_project_upl_idx'),
+        ]
+
     def __str__(self):
         return self.filename
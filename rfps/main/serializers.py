@@ -63,12 +63,36 @@ class RFPDocumentSerializer(serializers.ModelSerializer):
         }
 
 
+class RFPDocumentBulkUploadSerializer(serializers.Serializer):
+    """Validates the multipart input of the bulk document upload."""
+    document_files = serializers.ListField(
+        child=serializers.FileField(),
+        allow_empty=False,
+        help_text="The RFP files to upload."
+    )
+    project = serializers.PrimaryKeyRelatedField(
+        queryset=Project.objects.all(),
+        required=False,
+        allow_null=True,
+        help_text="ID of the project to attach every uploaded document to."
+    )
+
+
 class PromptSerializer(serializers.Serializer):
     prompt = serializers.CharField(
         required=True,
         max_length=500,
         help_text="The question to be answered by the RAG system."
     )
+    project_id = serializers.IntegerField(
+        required=False,
+        help_text="Only answer from the documents indexed for this project."
+    )
+    stream = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Stream the answer back as server-sent events."
+    )
 
 
 class ProjectRAGSerializer(serializers.Serializer):
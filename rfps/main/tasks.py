@@ -0,0 +1,77 @@
+import logging
+from itertools import batched
+from pathlib import Path
+
+from celery import shared_task
+from django.conf import settings
+
+from .models import RFPDocument
+from .utils.document_processing import iter_load_and_split
+from .utils.rag_service import RAGService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def ingest_project(project_id: int) -> dict:
+    """
+    Retrieves a project's documents, splits them, and inserts the chunks
+    into Pinecone. Runs on a Celery worker so InsertRAGView can return
+    immediately.
+    """
+    # InsertRAGView has already checked the project exists; go straight to
+    # its documents in a single query.
+    rfp_documents = list(
+        RFPDocument.objects
+        .filter(project_id=project_id)
+        .only('file_id', 'document_file', 'file_type', 'filename')
+    )
+    if not rfp_documents:
+        return {
+            "message": f"No RFPDocuments found for Project ID {project_id}. Nothing to index.",
+            "project_id": project_id,
+            "documents_processed": 0,
+        }
+
+    tasks = []
+    # This ensures the path is correct regardless of OS
+    media_root = Path(settings.MEDIA_ROOT)
+
+    for doc in rfp_documents:
+        # Missing files are skipped by load_and_split when the loader fails
+        # to open them, rather than stat'ed here first.
+        file_path = media_root / doc.document_file.name
+        logger.info(
+            "Processing document: %s at %s with %s", doc.filename, file_path, doc.file_type)
+        tasks.append(
+            (doc.file_type, file_path, {"project_id": project_id}))
+
+    # Parse and split the files in parallel worker processes, and
+    # insert chunks in batches while the remaining files are parsed.
+    workers = min(settings.RFP_LOAD_WORKERS, len(tasks))
+
+    def iter_chunks():
+        for chunked_docs in iter_load_and_split(tasks, workers):
+            logger.info("Doc split into %d chunks.", len(chunked_docs))
+            yield from chunked_docs
+
+    inserted_count = skipped_count = 0
+    for batch in batched(iter_chunks(), RAGService.STREAM_BATCH_SIZE):
+        result = RAGService.insert_documents(batch)
+        inserted_count += result.get('inserted_count', 0)
+        skipped_count += result.get('skipped_count', 0)
+
+    if not inserted_count and skipped_count:
+        message = f"All {skipped_count} chunks for project {project_id} were already indexed."
+    elif not inserted_count:
+        message = f"No processable chunks found for Project ID {project_id}. Nothing to insert."
+    else:
+        message = f"Successfully inserted {inserted_count} chunks for project {project_id}."
+
+    return {
+        "message": message,
+        "project_id": project_id,
+        "documents_processed": len(rfp_documents),
+        "inserted_count": inserted_count,
+        "skipped_count": skipped_count,
+    }
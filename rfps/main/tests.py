@@ -1,3 +1,162 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from langchain_core.documents import Document
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from .models import Project, RFPDocument
+from .utils.rag_service import RAGService
+from .views import QueryRAGView
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RFPDocumentBulkUploadTests(APITestCase):
+    url = reverse('rfpdocument-bulk')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='uploader@example.com', password='password',
+            first_name='Up', last_name='Loader')
+        self.client.force_authenticate(self.user)
+
+    def upload(self, **data):
+        files = [
+            SimpleUploadedFile('first.docx', b'first'),
+            SimpleUploadedFile('Second.PDF', b'second'),
+        ]
+        return self.client.post(
+            self.url, {'document_files': files, **data}, format='multipart')
+
+    def test_non_integer_project_is_rejected(self):
+        response = self.upload(project='abc')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('project', response.data)
+        self.assertFalse(RFPDocument.objects.exists())
+
+    def test_unknown_project_is_rejected(self):
+        response = self.upload(project=12345)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('project', response.data)
+        self.assertFalse(RFPDocument.objects.exists())
+
+    def test_files_are_created_for_project(self):
+        project = Project.objects.create(
+            name='Bridge', type='Construction', due_date='2030-01-01T00:00:00Z',
+            description='', value=1, manager=self.user)
+
+        response = self.upload(project=project.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        documents = RFPDocument.objects.filter(project=project).order_by('filename')
+        self.assertEqual(
+            [(d.filename, d.file_type) for d in documents],
+            [('Second', 'pdf'), ('first', 'docx')])
+        self.assertTrue(all(len(d.file_id) == 32 for d in documents))
+
+
+class OpenAIChatTests(APITestCase):
+    url = reverse('openaichat')
+    messages = [{'role': 'user', 'content': 'Hi'}]
+
+    @mock.patch('main.views.chat_with_gpt', return_value='Hello')
+    def test_false_string_stream_is_not_streamed(self, chat):
+        response = self.client.post(
+            self.url, {'messages': self.messages, 'stream': 'false'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'response': 'Hello'})
+        chat.assert_called_once_with(self.messages)
+
+    def test_invalid_stream_is_rejected(self):
+        response = self.client.post(
+            self.url, {'messages': self.messages, 'stream': 'sometimes'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('stream', response.data)
+
+
+class QueryRAGStreamTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='asker@example.com', password='password',
+            first_name='As', last_name='Ker')
+
+    def query(self, **data):
+        request = APIRequestFactory().post(
+            '/query', {'prompt': 'Scope?', 'project_id': 1, **data}, format='json')
+        force_authenticate(request, self.user)
+        return QueryRAGView.as_view()(request)
+
+    @mock.patch('main.views.RAGService.get_rag_chain')
+    def test_streamed_answer_is_cached(self, get_rag_chain):
+        get_rag_chain.return_value.stream.return_value = iter(['Two ', 'bridges.'])
+
+        response = self.query(stream=True)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.endswith('data: [DONE]\n\n'))
+
+        response = self.query()
+        self.assertEqual(response.data['answer'], 'Two bridges.')
+        self.assertTrue(response.data['cached'])
+        get_rag_chain.assert_called_once()
+
+    @mock.patch('main.views.RAGService.get_rag_chain')
+    def test_failed_stream_is_not_cached(self, get_rag_chain):
+        def tokens():
+            yield 'Two '
+            raise RuntimeError('upstream closed')
+        get_rag_chain.return_value.stream.return_value = tokens()
+
+        with self.assertLogs('main', 'ERROR'):
+            b''.join(self.query(stream=True).streaming_content)
+
+        get_rag_chain.return_value.invoke.return_value = 'Two bridges.'
+        response = self.query()
+        self.assertNotIn('cached', response.data)
+
+
+class InsertDocumentsDedupTests(SimpleTestCase):
+    def chunks(self, project_id, *texts):
+        return [Document(page_content=text, metadata={'project_id': project_id})
+                for text in texts]
+
+    def test_same_content_in_two_projects_gets_different_ids(self):
+        first, again, other = (
+            RAGService.chunk_id(chunk)
+            for chunk in self.chunks(1, 'Scope', 'Scope') + self.chunks(2, 'Scope'))
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+
+    def test_reingest_of_indexed_chunks_inserts_nothing(self):
+        chunks = self.chunks(1, 'Scope', 'Budget', 'Scope')
+        manager = mock.Mock()
+        manager.existing_ids.side_effect = set
+
+        with mock.patch.object(RAGService, '_initialize_components'), \
+                mock.patch.object(RAGService, '_pinecone_manager', manager), \
+                mock.patch.object(RAGService, '_embed_texts') as embed_texts:
+            result = RAGService.insert_documents(iter(chunks))
+
+        self.assertEqual(result, {'inserted_count': 0, 'skipped_count': 3})
+        self.assertEqual(len(manager.existing_ids.call_args.args[0]), 2)
+        embed_texts.assert_not_called()
+        manager.upsert_vectors.assert_not_called()
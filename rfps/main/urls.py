@@ -5,6 +5,7 @@ from .views import (
     RFPDocumentViewSet,
     QueryRAGView,
     InsertRAGView,
+    IngestStatusView,
     OpenAIChat
 )
 
@@ -17,5 +18,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('query', QueryRAGView.as_view(), name='rag-query'),
     path('insert-rag', InsertRAGView.as_view(), name='rag-query'),
+    path('insert-rag/<str:task_id>', IngestStatusView.as_view(),
+         name='rag-insert-status'),
     path('chatai', OpenAIChat.as_view(), name='openaichat')
 ]
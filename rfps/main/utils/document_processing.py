@@ -0,0 +1,185 @@
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import (
+    Docx2txtLoader,
+    PyMuPDFLoader,
+    PyPDFLoader,
+)
+from langchain_core.documents import Document
+
+try:
+    # Optional Rust splitter (`pip install rfp-langchain[fast]`); same
+    # recurse-by-separator chunking at native speed.
+    from semantic_text_splitter import TextSplitter
+except ImportError:
+    TextSplitter = None
+
+logger = logging.getLogger(__name__)
+
+# The LangChain file loaders accept paths as well as strings.
+StrPath = Union[str, os.PathLike]
+
+# Built on first use and then reused for the life of the process (by every
+# pool worker across files), rather than at import: loading the encoder may
+# download its BPE file, and web processes import this module without ever
+# splitting text. Chunks are measured in cl100k_base tokens, the encoding
+# text-embedding-3-small bills and limits by, so chunk sizes no longer vary
+# with how many characters a token happens to span. Chunks break on
+# paragraph, line, then sentence boundaries and don't overlap, so each
+# piece of text is embedded and stored once.
+CHUNK_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 0
+
+
+@functools.cache
+def _token_encoder() -> tiktoken.Encoding:
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    # disallowed_special=() treats text such as "<|endoftext|>" in an
+    # upload as plain text instead of raising.
+    return len(_token_encoder().encode(text, disallowed_special=()))
+
+
+@functools.cache
+def _text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_TOKENS,
+        chunk_overlap=CHUNK_OVERLAP_TOKENS,
+        length_function=count_tokens,
+        separators=["\n\n", "\n", ". ", " ", ""],
+        # Keep ". " on the sentence it ends, not the start of the next chunk.
+        keep_separator="end",
+    )
+
+
+@functools.cache
+def _fast_splitter():
+    if TextSplitter is None:
+        return None
+    # "gpt-3.5-turbo" selects tiktoken-rs's cl100k_base tokenizer.
+    return TextSplitter.from_tiktoken_model(
+        "gpt-3.5-turbo", CHUNK_TOKENS, overlap=CHUNK_OVERLAP_TOKENS)
+
+
+def split_documents(documents: List[Document]) -> List[Document]:
+    """Splits documents into chunks, using the Rust splitter when installed."""
+    fast_splitter = _fast_splitter()
+    if fast_splitter is None:
+        return _text_splitter().split_documents(documents)
+    return [
+        Document(page_content=chunk, metadata=dict(document.metadata))
+        for document in documents
+        for chunk in fast_splitter.chunks(document.page_content)
+    ]
+
+
+def _load_pdf(file_path: StrPath) -> List[Document]:
+    """Extracts PDF text with PyMuPDF, falling back to pypdf for files it rejects."""
+    try:
+        return PyMuPDFLoader(file_path).load()
+    except RuntimeError as e:
+        # MuPDF parse failures (pymupdf.FileDataError is a RuntimeError).
+        # A missing path (ValueError/FileNotFoundError) propagates to
+        # load_and_split instead of being retried.
+        logger.warning("PyMuPDF could not read %s (%s); retrying with pypdf.", file_path, e)
+        return PyPDFLoader(file_path).load()
+
+
+# File extension -> function returning the file's LangChain Documents.
+# Add an entry here to support another upload type.
+LOADERS: Dict[str, Callable[[StrPath], List[Document]]] = {
+    'pdf': _load_pdf,
+    'docx': lambda file_path: Docx2txtLoader(file_path).load(),
+}
+
+
+def _init_worker_logging(level: int) -> None:
+    # Workers start without the parent's logging config (whose QueueHandler
+    # is drained by a listener thread they don't have); log straight to
+    # stderr at the parent's level instead.
+    logger = logging.getLogger('main')
+    logger.handlers = [logging.StreamHandler()]
+    logger.setLevel(level)
+
+
+def load_and_split(file_type: str, file_path: StrPath, metadata: dict) -> List[Document]:
+    """
+    Loads one RFP file and splits it into chunks tagged with `metadata`.
+    Kept free of Django state so it can run in a worker process.
+    """
+    load = LOADERS.get(file_type)
+    if load is None:
+        logger.warning("Unsupported file_type %r for document. Skipping.", file_type)
+        return []
+    try:
+        documents = load(file_path)
+    except (FileNotFoundError, ValueError) as e:
+        # LangChain's file loaders report a missing path as ValueError.
+        logger.warning("Could not load %s (%s). Skipping.", file_path, e)
+        return []
+    except Exception:
+        # A corrupt upload (e.g. pypdf's PdfStreamError after the PyMuPDF
+        # fallback, or BadZipFile for a .docx) must not fail the whole
+        # project's ingest, whose earlier batches are already upserted.
+        logger.exception("Could not parse %s. Skipping.", file_path)
+        return []
+
+    # Scanned PDFs without OCR yield empty pages; don't split or embed them.
+    documents = [d for d in documents if d.page_content and d.page_content.strip()]
+    if not documents:
+        logger.warning("No extractable text in %s. Skipping.", file_path)
+        return []
+
+    for document in documents:
+        document.metadata.update(metadata)
+
+    return split_documents(documents)
+
+
+def iter_load_and_split(
+    tasks: Iterable[Tuple[str, StrPath, dict]], max_workers: int
+) -> Iterator[List[Document]]:
+    """
+    Runs `load_and_split` for each (file_type, file_path, metadata) task in a
+    process pool, yielding each file's chunks as soon as it is done. At most
+    two tasks per worker are queued at once, so a large project doesn't pile
+    up parsed documents in memory. With one worker, or inside a daemonic
+    process (e.g. a prefork Celery child), which may not start a pool,
+    files are loaded in this process, one after another.
+    """
+    if max_workers <= 1 or multiprocessing.current_process().daemon:
+        for task in tasks:
+            yield load_and_split(*task)
+        return
+
+    tasks = iter(tasks)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        # Not fork: the caller is multithreaded (Celery thread-pool tasks,
+        # the logging listener, HTTP and embedding pools), and a forked
+        # child can deadlock on a lock one of those threads held.
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=_init_worker_logging,
+        initargs=(logging.getLogger('main').getEffectiveLevel(),),
+    ) as pool:
+        pending = {
+            pool.submit(load_and_split, *task)
+            for task in islice(tasks, max_workers * 2)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                task = next(tasks, None)
+                if task is not None:
+                    pending.add(pool.submit(load_and_split, *task))
@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps another Embeddings provider with an in-process LRU of vectors keyed
+    by SHA-256(model name + "\\0" + text), so repeated queries (e.g. a user
+    hitting "regenerate") skip the API call. Only cache misses are sent to
+    the wrapped provider. Bulk ingestion should embed through `inner`
+    directly rather than filling the cache with one-off chunk vectors.
+    """
+
+    def __init__(self, inner: Embeddings, max_size: int = 10_000,
+                 model_name: Optional[str] = None):
+        self.inner = inner
+        self.max_size = max_size
+        # Part of every key, so vectors from different models never mix.
+        self.model_name = model_name or getattr(inner, "model", type(inner).__name__)
+        self._cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).digest()
+
+    def _lookup(self, texts: List[str]):
+        """Returns cached vectors (None on miss) and the distinct missing texts."""
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            vectors = [self._cache.get(key) for key in keys]
+            for key, vector in zip(keys, vectors):
+                if vector is not None:
+                    self._cache.move_to_end(key)
+        missing = list(dict.fromkeys(
+            text for text, vector in zip(texts, vectors) if vector is None))
+        return keys, vectors, missing
+
+    def _store(self, texts: List[str], vectors: List[List[float]]) -> Dict[bytes, List[float]]:
+        fresh = {self._key(text): vector for text, vector in zip(texts, vectors)}
+        with self._lock:
+            self._cache.update(fresh)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return fresh
+
+    @staticmethod
+    def _merge(keys, vectors, fresh) -> List[List[float]]:
+        return [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup(texts)
+        fresh = self._store(missing, self.inner.embed_documents(missing)) if missing else {}
+        return self._merge(keys, vectors, fresh)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup(texts)
+        fresh = self._store(missing, await self.inner.aembed_documents(missing)) if missing else {}
+        return self._merge(keys, vectors, fresh)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
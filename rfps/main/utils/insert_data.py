@@ -1,7 +1,31 @@
+import logging
+from itertools import batched
+
+import docx
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import Docx2txtLoader
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
-from pinecone_manager import PineconeManager
+from pinecone_setup import PineconeManager
+
+
+def iter_docx_chunks(path: str, text_splitter, buffer_size: int = 20_000):
+    """
+    Yields chunk Documents from a .docx paragraph by paragraph, holding only a
+    rolling window of text instead of the whole document and chunk list.
+    """
+    metadata = {"source": path}
+    buffer = ""
+    for paragraph in docx.Document(path).paragraphs:
+        buffer += paragraph.text + "\n\n"
+        if len(buffer) < buffer_size:
+            continue
+        pieces = text_splitter.split_text(buffer)
+        # The last piece may be cut at the window edge; carry it forward.
+        for piece in pieces[:-1]:
+            yield Document(page_content=piece, metadata=metadata)
+        buffer = pieces[-1] if pieces else ""
+    for piece in text_splitter.split_text(buffer):
+        yield Document(page_content=piece, metadata=metadata)
 
 
 def main():
@@ -9,31 +33,40 @@ def main():
     print("--- Starting Data Insertion Process ---")
 
     # --- 1. Configuration ---
-    PINECONE_INDEX_NAME = "rag-knowledge-base"
+    # The index RAGService queries (see RAGService.PINECONE_INDEX_NAME).
+    PINECONE_INDEX_NAME = "rag-docx-index-512"
+    EMBEDDING_DIMENSION = 512
     DOCX_FILE_PATH = "example.docx"  # Make sure this file exists
+    INSERT_BATCH_SIZE = 64
 
     # --- 2. Initialize Models and Manager ---
-    embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small")
+    embeddings_model = OpenAIEmbeddings(
+        model="text-embedding-3-small", dimensions=EMBEDDING_DIMENSION)
     manager = PineconeManager(
-        index_name=PINECONE_INDEX_NAME, embedding_model=embeddings_model)
+        index_name=PINECONE_INDEX_NAME, embedding_model=embeddings_model,
+        embedding_dimension=EMBEDDING_DIMENSION)
 
-    # --- 3. Load and Chunk Document ---
-    print(f"🔄 Loading document: {DOCX_FILE_PATH}...")
-    loader = Docx2txtLoader(DOCX_FILE_PATH)
-    documents = loader.load()
+    # --- 3. Connect to the index, creating it if it doesn't exist ---
+    manager.create_or_connect_vectorstore(documents=None)
 
+    # --- 4. Stream Chunks into the Index ---
+    print(f"🔄 Loading document: {DOCX_FILE_PATH}...")
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000, chunk_overlap=200)
-    chunked_docs = text_splitter.split_documents(documents)
-    print(f"📄 Document split into {len(chunked_docs)} chunks.")
+    batches = batched(
+        iter_docx_chunks(DOCX_FILE_PATH, text_splitter), INSERT_BATCH_SIZE)
 
-    # --- 4. Create Index and Insert Data ---
-    # This will create the index if it doesn't exist and add the documents.
-    # If the index exists, it will connect and you could add more docs if needed.
-    manager.create_or_connect_vectorstore(documents=chunked_docs)
+    # Chunks are added as they are split, not after the whole file is read.
+    inserted = 0
+    for batch in batches:
+        manager.add_documents(list(batch))
+        inserted += len(batch)
+        print(f"📄 {inserted} chunks inserted.")
 
     print("--- ✅ Data Insertion Process Complete ---")
 
 
 if __name__ == "__main__":
+    # Surface PineconeManager's progress messages.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
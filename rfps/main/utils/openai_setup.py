@@ -1,10 +1,84 @@
+import asyncio
 import os
-from openai import OpenAI
+import threading
+from openai import (
+    AsyncOpenAI,
+    OpenAI,
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+)
 from dotenv import load_dotenv
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
 load_dotenv()
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Retries are handled by `_retry_openai` below so 429s get the longer backoff.
+openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+# For streaming under ASGI, where awaiting the API doesn't hold a thread.
+async_openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+# Process-wide cap on in-flight completion requests, shared by every call
+# site (defaults to the OpenAI tier-1 concurrency).
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", 35))
+_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+# The same cap for the async client (a threading semaphore would block the
+# event loop). Created lazily so it binds to the serving loop.
+_async_request_slots = None
+
+_backoff = wait_exponential(multiplier=1, max=30)
+
+
+def _wait_for_retry(retry_state) -> float:
+    """Honors the Retry-After header when present, else backs off exponentially."""
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), 30.0)
+    except (TypeError, ValueError):
+        return _backoff(retry_state)
+
+
+_retry_openai = retry(
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, InternalServerError)),
+    wait=_wait_for_retry,
+    stop=stop_after_attempt(5),
+    reraise=True,
+)
+
+
+# Callers hold a request slot around these (for a stream, until it has been
+# read to the end or closed), so retries' backoff runs inside the slot too.
+@_retry_openai
+def _create_chat_completion(messages: list, **kwargs):
+    return openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        **kwargs
+    )
+
+
+@_retry_openai
+async def _acreate_chat_completion(messages: list, **kwargs):
+    return await async_openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        **kwargs
+    )
+
+
+def _async_slots() -> asyncio.BoundedSemaphore:
+    global _async_request_slots
+    if _async_request_slots is None:
+        _async_request_slots = asyncio.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+    return _async_request_slots
 
 
 def chat_with_gpt(messages: list) -> str:
@@ -16,8 +90,43 @@ def chat_with_gpt(messages: list) -> str:
         {"role": "assistant", "content": "Hi there!"}
     ]
     """
-    response = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages
-    )
+    with _request_slots:
+        response = _create_chat_completion(messages)
     return response.choices[0].message.content
+
+
+def chat_with_gpt_stream(messages: list):
+    """
+    Same as `chat_with_gpt`, but yields the completion piece by piece
+    as the model produces it. The request slot is held until the stream
+    is exhausted or the generator is closed.
+    """
+    _request_slots.acquire()
+    try:
+        stream = _create_chat_completion(messages, stream=True)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+    finally:
+        _request_slots.release()
+
+
+async def achat_with_gpt_stream(messages: list):
+    """
+    Async version of `chat_with_gpt_stream`, for views served over ASGI.
+    """
+    slots = _async_slots()
+    await slots.acquire()
+    try:
+        stream = await _acreate_chat_completion(messages, stream=True)
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+    finally:
+        slots.release()
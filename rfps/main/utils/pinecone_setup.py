@@ -1,6 +1,13 @@
+import logging
 import os
+import textwrap
+import threading
+import time
+from itertools import batched
+from typing import Final
 from dotenv import load_dotenv
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import NotFoundException, PineconeApiException
 
 from langchain_pinecone import PineconeVectorStore
 from langchain.prompts import PromptTemplate
@@ -9,75 +16,181 @@ from langchain.schema.output_parser import StrOutputParser
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Shared by every PineconeManager; parsed once at import.
+RAG_PROMPT: Final[PromptTemplate] = PromptTemplate.from_template(textwrap.dedent("""
+    Use only the information from the context below to answer the question.
+    If the answer is not in the context, say "I don't have enough information to answer that."
+
+    Context:
+    {context}
+
+    Question:
+    {question}
+
+    Answer:
+    """).strip())
+
 
 class PineconeManager:
     """A class to manage Pinecone index operations and RAG pipeline creation."""
 
-    def __init__(self, index_name: str, embedding_model):
+    # Index names confirmed to exist, with the time they were last checked;
+    # shared by all managers so steady-state connects skip the control plane.
+    INDEX_CACHE_TTL: float = 60.0
+    _index_cache: dict[str, float] = {}
+
+    # Bulk-insert tuning: vectors per upsert request (PINECONE_BATCH; 200
+    # 512-d vectors with chunk text stays well under Pinecone's 2MB request
+    # limit), texts per embedding request, and the size of the index
+    # client's thread pool, i.e. how many upsert batches are in flight at once
+    # (PINECONE_POOL_THREADS; lower it if Pinecone starts rate limiting).
+    UPSERT_BATCH_SIZE: int = int(os.environ.get("PINECONE_BATCH", 200))
+    EMBEDDINGS_CHUNK_SIZE: int = 1000
+    POOL_THREADS: int = int(os.environ.get("PINECONE_POOL_THREADS", 30))
+    # Ids per fetch request; fetch is a GET, so this bounds the URL length.
+    FETCH_BATCH_SIZE: int = 100
+
+    # Upper bound on memoized RAG chains (one per llm/k/project combination).
+    MAX_CACHED_CHAINS: int = 64
+
+    def __init__(self, index_name: str, embedding_model, embedding_dimension: int = 1536):
         if not index_name:
             raise ValueError("Pinecone index name cannot be empty.")
 
         self.pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
         self.index_name = index_name
         self.embedding_model = embedding_model
-        self.embedding_dimension = 1536  # Dimension for 'text-embedding-3-small'
+        # Must match the embedding model's output size (1536 is the full
+        # 'text-embedding-3-small'; it can be truncated via `dimensions=`).
+        self.embedding_dimension = embedding_dimension
+        self.index = None
         self.vectorstore = None
-        print("✅ PineconeManager initialized.")
+        self._rag_chains = {}
+        self._chain_lock = threading.Lock()
+        logger.info("PineconeManager initialized.")
+
+    def index_exists(self) -> bool:
+        """Checks whether the index exists, asking Pinecone only on a stale cache."""
+        cache = type(self)._index_cache
+        now = time.monotonic()
+        checked_at = cache.get(self.index_name)
+        if checked_at is not None and now - checked_at < self.INDEX_CACHE_TTL:
+            return True
+        try:
+            self.pc.describe_index(self.index_name)
+        except NotFoundException:
+            cache.pop(self.index_name, None)
+            return False
+        cache[self.index_name] = now
+        return True
 
     def create_or_connect_vectorstore(self, documents=None):
-        if self.index_name not in self.pc.list_indexes().names():
-            if not documents:
-                raise ValueError(
-                    "Documents must be provided to create a new index.")
+        """
+        Connects to the index, creating an empty one (sized to the embedding
+        dimension) if it doesn't exist yet, then adds `documents` if given.
+        """
+        # Chains built on a previous vectorstore must not outlive it.
+        with self._chain_lock:
+            self._rag_chains.clear()
+        if not self.index_exists():
+            self._create_index()
+        else:
+            logger.info(
+                "Connecting to existing Pinecone index: %s", self.index_name)
+        self._connect()
+        logger.info("Connected to index.")
+        if documents:
+            self.add_documents(documents)
+            logger.info("Documents embedded.")
+        return self.vectorstore
 
-            print(f"🌲 Creating new Pinecone index: {self.index_name}")
+    def _create_index(self) -> None:
+        logger.info("Creating new Pinecone index: %s", self.index_name)
+        try:
+            # Blocks until the index is ready to accept upserts.
             self.pc.create_index(
                 name=self.index_name,
                 dimension=self.embedding_dimension,
                 metric="cosine",
                 spec=ServerlessSpec(cloud="aws", region="us-east-1"),
             )
-            self.vectorstore = PineconeVectorStore.from_documents(
-                documents=documents,
-                embedding=self.embedding_model,
-                index_name=self.index_name
-            )
-            print("✅ Index created and documents embedded.")
-        else:
-            print(
-                f"🌲 Connecting to existing Pinecone index: {self.index_name}")
-            self.vectorstore = PineconeVectorStore.from_existing_index(
-                index_name=self.index_name,
-                embedding=self.embedding_model
-            )
-            print("✅ Connected to index.")
-        return self.vectorstore
+        except PineconeApiException as e:
+            # Another worker created it first.
+            if e.status != 409:
+                raise
+        type(self)._index_cache[self.index_name] = time.monotonic()
+
+    def _connect(self) -> None:
+        # One data-plane handle, shared by the vectorstore and direct upserts.
+        self.index = self.pc.Index(self.index_name, pool_threads=self.POOL_THREADS)
+        self.vectorstore = PineconeVectorStore(
+            index=self.index,
+            embedding=self.embedding_model,
+        )
+
+    def add_documents(self, documents):
+        """Embeds and upserts documents using the manager's batch settings."""
+        return self.vectorstore.add_documents(
+            documents=documents,
+            batch_size=self.UPSERT_BATCH_SIZE,
+            embedding_chunk_size=self.EMBEDDINGS_CHUNK_SIZE,
+        )
 
-    def get_rag_chain(self, llm, k=3):
+    def upsert_vectors(self, vectors) -> None:
+        """
+        Upserts precomputed (id, values, metadata) tuples, sending every batch
+        at once on the index's thread pool and then waiting for all of them.
+        """
+        async_results = [
+            self.index.upsert(vectors=list(batch), async_req=True)
+            for batch in batched(vectors, self.UPSERT_BATCH_SIZE)
+        ]
+        # .get() re-raises any failed batch.
+        for result in async_results:
+            result.get()
+
+    def existing_ids(self, ids) -> set:
+        """Returns the subset of `ids` already stored in the index."""
+        found = set()
+        for batch in batched(ids, self.FETCH_BATCH_SIZE):
+            found.update(self.index.fetch(ids=list(batch)).vectors)
+        return found
+
+    def get_rag_chain(self, llm, k=3, project_id=None):
         if not self.vectorstore:
             raise ConnectionError(
                 "Vector store not initialized. Call 'create_or_connect_vectorstore' first.")
 
-        print("🚀 Building RAG chain...")
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": k})
-        prompt_template = """
-        Use only the information from the context below to answer the question.
-        If the answer is not in the context, say "I don't have enough information to answer that."
+        cache_key = (id(llm), k, project_id)
+        rag_chain = self._rag_chains.get(cache_key)
+        if rag_chain is not None:
+            return rag_chain
 
-        Context:
-        {context}
-
-        Question:
-        {question}
+        # Concurrent first requests build each chain once, and eviction
+        # never races another thread's insert.
+        with self._chain_lock:
+            rag_chain = self._rag_chains.get(cache_key)
+            if rag_chain is None:
+                rag_chain = self._build_rag_chain(llm, k, project_id)
+                if len(self._rag_chains) >= self.MAX_CACHED_CHAINS:
+                    # Evict the oldest entry; dicts keep insertion order.
+                    self._rag_chains.pop(next(iter(self._rag_chains)))
+                self._rag_chains[cache_key] = rag_chain
+        return rag_chain
 
-        Answer:
-        """
-        prompt = PromptTemplate.from_template(prompt_template)
+    def _build_rag_chain(self, llm, k, project_id):
+        logger.info("Building RAG chain (k=%s, project_id=%s)", k, project_id)
+        search_kwargs = {"k": k}
+        if project_id is not None:
+            # All projects share one namespace; scope by chunk metadata instead.
+            search_kwargs["filter"] = {"project_id": project_id}
+        retriever = self.vectorstore.as_retriever(search_kwargs=search_kwargs)
         rag_chain = (
             {"context": retriever, "question": RunnablePassthrough()}
-            | prompt
+            | RAG_PROMPT
             | llm
             | StrOutputParser()
         )
-        print("✅ RAG chain is ready.")
         return rag_chain
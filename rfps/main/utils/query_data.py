@@ -1,3 +1,5 @@
+import logging
+
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from pinecone_setup import PineconeManager
 
@@ -7,13 +9,16 @@ def main():
     print("--- Starting Query Process ---")
 
     # --- 1. Configuration ---
-    PINECONE_INDEX_NAME = "rag-docx-index-modular"
+    PINECONE_INDEX_NAME = "rag-docx-index-512"
+    EMBEDDING_DIMENSION = 512
 
     # --- 2. Initialize Models and Manager ---
-    embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small")
+    embeddings_model = OpenAIEmbeddings(
+        model="text-embedding-3-small", dimensions=EMBEDDING_DIMENSION)
     llm = ChatOpenAI(model="gpt-4o")
     manager = PineconeManager(
-        index_name=PINECONE_INDEX_NAME, embedding_model=embeddings_model)
+        index_name=PINECONE_INDEX_NAME, embedding_model=embeddings_model,
+        embedding_dimension=EMBEDDING_DIMENSION)
 
     manager.create_or_connect_vectorstore(documents=None)
 
@@ -33,4 +38,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Surface PineconeManager's progress messages.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
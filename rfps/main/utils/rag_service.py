@@ -1,74 +1,178 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import batched
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from .embedding_cache import CachedEmbeddings
 from .pinecone_setup import PineconeManager
-from typing import List, Dict, Any, Optional
+from typing import Iterable, List, Dict, Any, Optional
 from langchain_core.documents import Document
 from langchain_core.runnables import RunnableSerializable
 
+logger = logging.getLogger(__name__)
+
 
 class RAGService:
     """
     Handles lazy and single initialization of the heavy RAG components (LLM, Index).
     """
 
-    _rag_chain: Optional[RunnableSerializable[Dict[str, Any], str]] = None
     _pinecone_manager: Optional[PineconeManager] = None
-    _embeddings_model: Optional[OpenAIEmbeddings] = None
+    _embeddings_model: Optional[CachedEmbeddings] = None
     _llm: Optional[ChatOpenAI] = None
-    PINECONE_INDEX_NAME: str = "rag-docx-index-modular"
+    # text-embedding-3-small truncated to 512 dimensions: a third of the
+    # vector bytes and similarity compute for a small recall cost. The old
+    # 1536-d "rag-docx-index-modular" index is left in place for migration.
+    PINECONE_INDEX_NAME: str = "rag-docx-index-512"
+    EMBEDDING_DIMENSION: int = 512
+    _init_lock = threading.Lock()
+    # Texts per embedding request (EMBED_BATCH; 256 512-token chunks stays
+    # under the API's per-request token limit), and how many requests run
+    # at once (kept low enough to stay inside OpenAI tier-1 rate limits).
+    EMBED_BATCH_SIZE: int = int(os.environ.get("EMBED_BATCH", 256))
+    EMBED_CONCURRENCY: int = 8
+    # Chunks per insert_documents call when streaming an ingest: enough to
+    # keep every concurrent embedding request full.
+    STREAM_BATCH_SIZE: int = EMBED_BATCH_SIZE * EMBED_CONCURRENCY
+    # Shared by every ingest in the process (e.g. concurrent Celery thread
+    # tasks), so EMBED_CONCURRENCY is a process-wide cap. The sync client's
+    # connection pool is thread-safe; the async one is tied to a single
+    # event loop and can't be shared across async_to_sync calls.
+    _embed_pool = ThreadPoolExecutor(
+        max_workers=EMBED_CONCURRENCY, thread_name_prefix="rag-embed")
 
     @classmethod
     def _initialize_components(cls) -> None:
         """
         Initializes components (embeddings, LLM, PineconeManager) only if they haven't been already.
-        Ensures these are singletons.
+        Ensures these are singletons, even when concurrent requests race into
+        the first initialization.
         """
-        if cls._embeddings_model is None:
-            cls._embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small")
-        if cls._llm is None:
-            cls._llm = ChatOpenAI(model="gpt-4o")
-        if cls._pinecone_manager is None:
-            cls._pinecone_manager = PineconeManager(
-                index_name=cls.PINECONE_INDEX_NAME,
-                embedding_model=cls._embeddings_model,
-            )
-            # Ensure the vectorstore is connected/created upon manager initialization
-            cls._pinecone_manager.create_or_connect_vectorstore(documents=None)
+        if cls._pinecone_manager is not None:
+            return
+        with cls._init_lock:
+            if cls._embeddings_model is None:
+                cls._embeddings_model = CachedEmbeddings(OpenAIEmbeddings(
+                    model="text-embedding-3-small",
+                    dimensions=cls.EMBEDDING_DIMENSION,
+                    # One /v1/embeddings call per EMBED_BATCH_SIZE texts
+                    # (the API takes up to 2048 inputs per call).
+                    chunk_size=cls.EMBED_BATCH_SIZE,
+                    # Chunks are already token-bounded by the splitter, so
+                    # skip re-tokenizing every text client-side.
+                    check_embedding_ctx_length=False,
+                ), model_name=f"text-embedding-3-small:{cls.EMBEDDING_DIMENSION}")
+            if cls._llm is None:
+                cls._llm = ChatOpenAI(model="gpt-4o")
+            if cls._pinecone_manager is None:
+                manager = PineconeManager(
+                    index_name=cls.PINECONE_INDEX_NAME,
+                    embedding_model=cls._embeddings_model,
+                    embedding_dimension=cls.EMBEDDING_DIMENSION,
+                )
+                # Ensure the vectorstore is connected/created upon manager initialization
+                manager.create_or_connect_vectorstore(documents=None)
+                cls._pinecone_manager = manager
 
     @classmethod
-    def get_rag_chain(cls) -> RunnableSerializable[Dict[str, Any], str]:
+    def warmup(cls) -> None:
         """
-        Initializes components and returns the RAG chain.
-        The RAG chain is initialized only once (singleton pattern).
+        Initializes the components, builds the unscoped RAG chain and runs one
+        retrieval, so the embedding and Pinecone connections are open before
+        the first query. The LLM is not called, to keep boot free of
+        completion costs. Failures are logged, not raised: requests retry
+        the lazy initialization.
         """
-        if cls._rag_chain is None:
-            print("--- Initializing RAG Service Components (One-Time Setup) ---")
-            cls._initialize_components()
-            # Ensure components are initialized before use
-            if cls._llm is None or cls._pinecone_manager is None:
-                raise RuntimeError("RAGService components failed to initialize.")
-            # Get the runnable RAG chain from the PineconeManager
-            cls._rag_chain = cls._pinecone_manager.get_rag_chain(llm=cls._llm)
-            print("--- RAG Service Initialization Complete ---")
+        try:
+            cls.get_rag_chain()
+            cls._pinecone_manager.vectorstore.similarity_search("ping", k=1)
+        except Exception:
+            logger.exception("RAG warm-up failed")
 
-        return cls._rag_chain
+    @classmethod
+    def get_rag_chain(cls, project_id: Optional[int] = None) -> RunnableSerializable[Dict[str, Any], str]:
+        """
+        Initializes components and returns the RAG chain, optionally restricted
+        to the chunks of one project. Chains are built once per project and
+        cached by the PineconeManager.
+        """
+        cls._initialize_components()
+        # Ensure components are initialized before use
+        if cls._llm is None or cls._pinecone_manager is None:
+            raise RuntimeError("RAGService components failed to initialize.")
+        return cls._pinecone_manager.get_rag_chain(llm=cls._llm, project_id=project_id)
+
+    @staticmethod
+    def chunk_id(chunk: Document) -> str:
+        """
+        Content-derived vector id: re-ingesting the same text for the same
+        project yields the same id. The project is part of the hash because
+        retrieval filters on the stored project_id.
+        """
+        key = f"{chunk.metadata.get('project_id')}\0{chunk.page_content}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
 
     @classmethod
-    def insert_documents(cls, chunks: List[Document]) -> Dict[str, int]:
+    def insert_documents(
+        cls, chunks: Iterable[Document], embed_batch: Optional[int] = None
+    ) -> Dict[str, int]:
         """
-        Inserts a list of document chunks into the Pinecone index.
+        Inserts document chunks (any iterable, consumed once) into the
+        Pinecone index, skipping chunks (by chunk_id) that are repeated or
+        already indexed, so boilerplate is embedded and written once.
+        Upserts go out in parallel batches. `embed_batch` overrides
+        EMBED_BATCH_SIZE, the number of texts per embedding request.
         Initializes components if they haven't been already.
         """
-        print(
-            "--- Initializing RAG Service Components for Insertion (One-Time Setup) ---"
-        )
         cls._initialize_components()
 
         if cls._pinecone_manager is None or cls._pinecone_manager.vectorstore is None:
             raise RuntimeError("PineconeManager or its vectorstore not initialized.")
 
-        print(f"--- Inserting {len(chunks)} chunks into Pinecone ---")
-        # Use the add_documents method directly from the PineconeVectorStore
-        cls._pinecone_manager.vectorstore.add_documents(documents=chunks)
-        print("--- Data Insertion Process Complete ---")
-        # Return a dictionary with inserted_count, as expected by InsertRAGView
-        return {"inserted_count": len(chunks)}
+        unique_chunks = {}
+        chunk_count = 0
+        for chunk in chunks:
+            chunk.metadata["chunk_id"] = cls.chunk_id(chunk)
+            unique_chunks.setdefault(chunk.metadata["chunk_id"], chunk)
+            chunk_count += 1
+        existing = cls._pinecone_manager.existing_ids(list(unique_chunks))
+        new_chunks = [
+            chunk for chunk_id, chunk in unique_chunks.items() if chunk_id not in existing
+        ]
+        skipped_count = chunk_count - len(new_chunks)
+
+        logger.info(
+            "Inserting %d chunks into Pinecone (%d duplicates skipped)",
+            len(new_chunks), skipped_count)
+        if new_chunks:
+            texts = [chunk.page_content for chunk in new_chunks]
+            embeddings = cls._embed_texts(texts, embed_batch or cls.EMBED_BATCH_SIZE)
+            # PineconeVectorStore reads the chunk text back from the "text" metadata key.
+            cls._pinecone_manager.upsert_vectors(
+                (chunk.metadata["chunk_id"], embedding,
+                 {**chunk.metadata, "text": chunk.page_content})
+                for chunk, embedding in zip(new_chunks, embeddings)
+            )
+        # Return a dictionary with inserted_count, as expected by ingest_project
+        return {"inserted_count": len(new_chunks), "skipped_count": skipped_count}
+
+    @classmethod
+    def _embed_texts(cls, texts: List[str], batch_size: int) -> List[List[float]]:
+        """
+        Embeds the texts in batches of `batch_size`, keeping up to
+        EMBED_CONCURRENCY requests in flight on the embedding thread pool
+        instead of sending each in turn. Returns vectors in order.
+        """
+        # Bypass the query-vector LRU: chunk_id dedup already keeps a chunk
+        # from being embedded twice, so caching ingest vectors would only
+        # crowd out queries (10k 512-d float lists are ~166 MB per worker).
+        embed_documents = cls._embeddings_model.inner.embed_documents
+        results = cls._embed_pool.map(
+            # chunk_size overrides the client's own EMBED_BATCH_SIZE split,
+            # so each batch really is one request.
+            lambda batch: embed_documents(list(batch), chunk_size=batch_size),
+            batched(texts, batch_size),
+        )
+        return [embedding for batch in results for embedding in batch]
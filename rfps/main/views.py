@@ -1,21 +1,105 @@
+import hashlib
+import json
+import logging
 import uuid
-import os
-from rest_framework import viewsets, permissions, status
+from pathlib import PurePath
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import viewsets, permissions, serializers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import Project, RFPDocument
 from .serializers import (
     ProjectSerializer,
     RFPDocumentSerializer,
+    RFPDocumentBulkUploadSerializer,
     PromptSerializer,
     ProjectRAGSerializer,
 )
 from .utils.rag_service import RAGService
-from .utils.openai_setup import chat_with_gpt
-from langchain_community.document_loaders import Docx2txtLoader, PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from django.conf import settings
-from pathlib import Path
+from .utils.openai_setup import (
+    achat_with_gpt_stream,
+    chat_with_gpt,
+    chat_with_gpt_stream,
+)
+from .tasks import ingest_project
+from celery.result import AsyncResult
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def _file_name_fields(uploaded_file) -> dict:
+    """The filename/file_type columns derived from an uploaded file's name."""
+    original_filename = PurePath(uploaded_file.name)
+    return {
+        'filename': original_filename.stem,
+        'file_type': original_filename.suffix[1:].lower(),
+    }
+
+
+def _is_asgi(request) -> bool:
+    """
+    Whether the request is served over ASGI, where async iterators stream
+    without holding a worker thread. Under WSGI, Django would buffer them.
+    """
+    return isinstance(request._request, ASGIRequest)
+
+
+def _sse_event(token) -> str:
+    return f"data: {json.dumps({'token': token})}\n\n"
+
+
+def _sse_error(e) -> str:
+    logger.exception("Streaming error")
+    return f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+
+def _sse_response(tokens, on_complete=None):
+    """
+    Wraps an iterator (or async iterator) of text pieces in a server-sent
+    events response, so clients see the first tokens without waiting for
+    the whole completion. `on_complete`, if given, is called with the full
+    text once the stream finishes without error.
+    """
+    def events():
+        pieces = []
+        try:
+            for token in tokens:
+                pieces.append(token)
+                yield _sse_event(token)
+        except Exception as e:
+            yield _sse_error(e)
+            return
+        if on_complete is not None:
+            on_complete("".join(pieces))
+        yield "data: [DONE]\n\n"
+
+    async def aevents():
+        pieces = []
+        try:
+            async for token in tokens:
+                pieces.append(token)
+                yield _sse_event(token)
+        except Exception as e:
+            yield _sse_error(e)
+            return
+        if on_complete is not None:
+            await sync_to_async(on_complete)("".join(pieces))
+        yield "data: [DONE]\n\n"
+
+    stream = aevents() if hasattr(tokens, "__aiter__") else events()
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
@@ -28,6 +112,43 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    LIST_CACHE_TIMEOUT = 300
+
+    def get_queryset(self):
+        # ProjectSerializer reads manager.email and nests primary_contacts;
+        # fetch both up front instead of once per project.
+        return (
+            Project.objects
+            .select_related('manager')
+            .only(
+                'id', 'name', 'type', 'due_date', 'description',
+                'stage', 'value', 'manager__email',
+                # Loaded so saves through this queryset still bump it.
+                'updated_at',
+            )
+            .prefetch_related(Prefetch(
+                'primary_contacts',
+                queryset=User.objects.only(
+                    'id', 'email', 'first_name', 'last_name'),
+            ))
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Serialized lists are cached under a key derived from the project
+        # count and latest updated_at, so any create/update/delete moves
+        # readers to a fresh key; the timeout bounds staleness from changes
+        # elsewhere (e.g. a contact's email).
+        version = Project.objects.aggregate(
+            count=Count('id'), latest=Max('updated_at'))
+        latest = version['latest'].timestamp() if version['latest'] else 0
+        cache_key = f"projects:v{version['count']}:{latest}:{request.get_full_path()}"
+
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, self.LIST_CACHE_TIMEOUT)
+        return Response(data)
+
     def perform_create(self, serializer):
         if "manager" not in serializer.validated_data:
             serializer.save(manager=self.request.user)
@@ -40,17 +161,25 @@ class RFPDocumentViewSet(viewsets.ModelViewSet):
     serializer_class = RFPDocumentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        # RFPDocumentSerializer reads uploaded_by.email and project.name;
+        # join both but load only the columns it renders.
+        return (
+            RFPDocument.objects
+            .select_related('uploaded_by', 'project')
+            .only(
+                'file_id', 'filename', 'file_type', 'document_file',
+                'uploaded_at', 'uploaded_by__email', 'project__name',
+            )
+        )
+
     def perform_create(self, serializer):
         uploaded_file = self.request.data.get("document_file")
-        original_filename = uploaded_file.name
-
-        base_name, file_extension = os.path.splitext(original_filename)
 
         serializer.save(
             uploaded_by=self.request.user,
-            file_id=str(uuid.uuid4()),
-            filename=base_name,
-            file_type=file_extension.lstrip(".").lower(),
+            file_id=uuid.uuid4().hex,
+            **_file_name_fields(uploaded_file),
         )
 
     def perform_update(self, serializer):
@@ -59,15 +188,43 @@ class RFPDocumentViewSet(viewsets.ModelViewSet):
         update_kwargs = {}
 
         if uploaded_file:
-            original_filename = uploaded_file.name
-            base_name, file_extension = os.path.splitext(original_filename)
-
-            update_kwargs['filename'] = base_name
-            update_kwargs['file_type'] = file_extension.lstrip(".").lower()
+            update_kwargs.update(_file_name_fields(uploaded_file))
 
         # Save the instance with any collected updates
         serializer.save(**update_kwargs)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Uploads every file in the multipart 'document_files' list (optionally
+        attached to 'project') with a single INSERT, instead of one request
+        and one INSERT per document.
+        """
+        upload = RFPDocumentBulkUploadSerializer(data=request.data)
+        if not upload.is_valid():
+            return Response(upload.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        uploaded_files = upload.validated_data['document_files']
+        project = upload.validated_data.get('project')
+
+        documents = [
+            RFPDocument(
+                file_id=uuid.uuid4().hex,
+                document_file=uploaded_file,
+                uploaded_by=request.user,
+                project=project,
+                **_file_name_fields(uploaded_file),
+            )
+            for uploaded_file in uploaded_files
+        ]
+        # bulk_create still runs each FileField's pre_save, so the files are
+        # written to storage as part of the insert.
+        with transaction.atomic():
+            RFPDocument.objects.bulk_create(documents)
+
+        serializer = self.get_serializer(documents, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 
 class QueryRAGView(APIView):
     """
@@ -76,22 +233,48 @@ class QueryRAGView(APIView):
 
     permission_classes = [permissions.IsAuthenticated]
 
+    # Repeated (project, prompt) pairs are answered from the cache for this
+    # long, skipping retrieval and the LLM call; it also bounds how stale an
+    # answer can be after new documents are indexed.
+    ANSWER_CACHE_TIMEOUT = 300
+
     def post(self, request):
         serializer = PromptSerializer(data=request.data)
 
         if serializer.is_valid():
             user_query = serializer.validated_data["prompt"]
+            project_id = serializer.validated_data.get("project_id")
+            cache_key = "rag:" + hashlib.sha256(
+                f"{project_id}\0{user_query}".encode()).hexdigest()
+
+            cached_answer = cache.get(cache_key)
+            if cached_answer is not None:
+                if serializer.validated_data["stream"]:
+                    return _sse_response(iter([cached_answer]))
+                return Response(
+                    {"query": user_query, "answer": cached_answer, "cached": True},
+                    status=status.HTTP_200_OK
+                )
 
             try:
                 # Get the RAG chain (initialized only the first time)
-                rag_chain = RAGService.get_rag_chain()
+                rag_chain = RAGService.get_rag_chain(project_id=project_id)
 
                 # Invoke the chain
                 # NOTE: For long-running queries, consider using Django Channels or
                 # a background worker (like Celery) to avoid blocking the request thread.
-                print(f"Invoking RAG chain for query: '{user_query}'")
+                logger.info("Invoking RAG chain for query: %r", user_query)
+
+                if serializer.validated_data["stream"]:
+                    def cache_answer(answer):
+                        cache.set(cache_key, answer, self.ANSWER_CACHE_TIMEOUT)
+
+                    if _is_asgi(request):
+                        return _sse_response(rag_chain.astream(user_query), cache_answer)
+                    return _sse_response(rag_chain.stream(user_query), cache_answer)
 
                 answer = rag_chain.invoke(user_query)
+                cache.set(cache_key, answer, self.ANSWER_CACHE_TIMEOUT)
 
                 # Return the result
                 return Response(
@@ -99,7 +282,7 @@ class QueryRAGView(APIView):
                 )
 
             except Exception as e:
-                print(f"RAG Chain Error: {e}")
+                logger.exception("RAG chain error")
                 return Response(
                     {
                         "error": "An error occurred while querying the knowledge base.",
@@ -113,8 +296,9 @@ class QueryRAGView(APIView):
 
 class InsertRAGView(APIView):
     """
-    POST endpoint to take a project ID, retrieve associated documents,
-    process, and insert chunks into Pinecone.
+    POST endpoint to take a project ID and queue a background job that
+    retrieves the associated documents, processes them, and inserts chunks
+    into Pinecone. Returns 202 with a task ID to poll on IngestStatusView.
     """
 
     permission_classes = [permissions.IsAuthenticated]
@@ -126,100 +310,54 @@ class InsertRAGView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         project_id = serializer.validated_data["project_id"]
+        # Only existence matters here; the task loads the documents.
+        # DRF turns the Http404 into a 404 response.
+        get_object_or_404(Project.objects.only('id'), pk=project_id)
 
         try:
-            project = Project.objects.get(pk=project_id)
-
-            if not project:
-                return Response(
-                    {"error": f"Project with ID {project_id} not found."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-            rfp_documents = project.documents.all()
-            if not rfp_documents:
-                return Response(
-                    {
-                        "message": f"No RFPDocuments found for Project ID {project_id}. Nothing to index."
-                    },
-                    status=status.HTTP_200_OK,
-                )
-
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000, chunk_overlap=200
-            )
-
-            all_chunked_docs = []
-
-            for doc in rfp_documents:
-                # This ensures the path is correct regardless of OS
-                file_path = Path(settings.MEDIA_ROOT) / doc.document_file.name
-
-                if not file_path.exists():
-                    print(
-                        f"File not found for document {doc.filename}: {file_path}")
-                    # Optionally skip this document or return an error
-                    continue
-
-                print(
-                    f"Processing document: {doc.filename} at {file_path} with {doc.file_type}")
-
-                if (doc.file_type == 'pdf'):
-                    loader = PyPDFLoader(
-                        str(file_path)
-                    )
-                elif (doc.file_type == 'docx'):
-                    loader = Docx2txtLoader(
-                        str(file_path)
-                    )
-                else:
-                    print(
-                        f"Unsupported file_type '{doc.file_type}' for document. Skipping.")
-                    continue
-                documents = loader.load()
-
-                chunked_docs = text_splitter.split_documents(documents)
-                print(f"Doc Split into {len(chunked_docs)} chunks.")
-
-                all_chunked_docs.extend(chunked_docs)
-
-            if not all_chunked_docs:
-                return Response(
-                    {
-                        "message": f"No processable chunks found for Project ID {project_id}. Nothing to insert."
-                    },
-                    status=status.HTTP_200_OK,
-                )
-
-            # 4. Insert Data into Pinecone using RAGService
-            result = RAGService.insert_documents(all_chunked_docs)
+            task = ingest_project.delay(project_id)
 
             return Response(
                 {
-                    "message": f"Successfully inserted {result.get('inserted_count', 0)} chunks for project {project_id}.",
+                    "message": f"Indexing queued for project {project_id}.",
                     "project_id": project_id,
-                    "documents_processed": len(rfp_documents),
+                    "task_id": task.id,
                 },
-                status=status.HTTP_200_OK,
+                status=status.HTTP_202_ACCEPTED,
             )
 
-        except Project.DoesNotExist:
-            return Response(
-                {"error": f"Project with ID {project_id} not found in the database."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
         except Exception as e:
-            # Catch file access, database connection, or LLM errors
-            print(f"RAG Insertion Error: {e}")
+            # Catch broker connection errors
+            logger.exception("RAG insertion error")
             return Response(
                 {
-                    "error": "An error occurred during data insertion.",
+                    "error": "An error occurred while queueing data insertion.",
                     "details": str(e),
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
 
+class IngestStatusView(APIView):
+    """
+    GET endpoint reporting the state of an ingestion task queued by
+    InsertRAGView, with its result once it has finished.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, task_id):
+        result = AsyncResult(task_id)
+        body = {"task_id": task_id, "state": result.state}
+
+        if result.successful():
+            body["result"] = result.result
+        elif result.failed():
+            body["error"] = str(result.result)
+
+        return Response(body, status=status.HTTP_200_OK)
+
+
 class OpenAIChat(APIView):
     def post(self, request):
         messages = request.data.get("messages", [])
@@ -230,7 +368,18 @@ class OpenAIChat(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Parsed like PromptSerializer.stream, so "false" and "0" mean False.
+        try:
+            stream = serializers.BooleanField().to_internal_value(
+                request.data.get("stream", False))
+        except serializers.ValidationError as e:
+            return Response({"stream": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
+            if stream:
+                if _is_asgi(request):
+                    return _sse_response(achat_with_gpt_stream(messages))
+                return _sse_response(chat_with_gpt_stream(messages))
             answer = chat_with_gpt(messages)
             return Response({"response": answer}, status=status.HTTP_200_OK)
         except Exception as e: